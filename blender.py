@@ -1,19 +1,73 @@
+import asyncio
 import bpy
-import bpy.mathutils as mathutils
-from math import radians
+import logging
+import numpy as np
+import os
+from math import cos, isfinite, radians, sin
 import socket
-import json
+import struct
+try:
+    import orjson
+except ImportError:
+    import json as orjson
 import threading
 import time
 
 OUTPUT_DATA_RATE = 50  # Hz
+RECV_SIZE = 65536  # bytes
+RING_SIZE = 64  # samples, must be a power of two
+RCVBUF_SIZE = 1 << 20  # bytes
+ERROR_LOG_INTERVAL = 1.0  # seconds
+ROTATION_EPSILON = 1e-3  # degrees
+
+logger = logging.getLogger(__name__)
+
+def euler_xyz_to_quaternion(x, y, z):
+    """Convert XYZ Euler angles in degrees to a (w, x, y, z) quaternion."""
+    hx, hy, hz = radians(x) * 0.5, radians(y) * 0.5, radians(z) * 0.5
+    cx, sx = cos(hx), sin(hx)
+    cy, sy = cos(hy), sin(hy)
+    cz, sz = cos(hz), sin(hz)
+    return (
+        cx * cy * cz + sx * sy * sz,
+        sx * cy * cz - cx * sy * sz,
+        cx * sy * cz + sx * cy * sz,
+        cx * cy * sz - sx * sy * cz,
+    )
 
 class RotationReceiver:
-    def __init__(self, host='127.0.0.1', port=65432):
+    def __init__(self, host='127.0.0.1', port=65432, reuse_port=False, cpu=None):
         self.host = host
         self.port = port
-        self.latest_rotation = {'x': 0.0, 'y': 0.0, 'z': 0.0}
+        # Set when several receivers share the port, see CubeRotationOperator
+        self.reuse_port = reuse_port
+        self.cpu = cpu
         self.running = True
+        # Single-producer/single-consumer ring of (x, y, z) samples.
+        # Only the receiver thread writes _head and only the consumer writes _tail.
+        self._ring = np.zeros((RING_SIZE, 3), dtype=np.float64)
+        self._head = 0
+        self._tail = 0
+        # Error logging is rate limited so bad input cannot stall the receive loop
+        self._last_error_log = float('-inf')
+        self._suppressed_errors = 0
+
+    def push(self, rotation_data):
+        x, y, z = rotation_data['x'], rotation_data['y'], rotation_data['z']
+        # The stdlib json fallback accepts NaN and Infinity, which would end up in the cube's rotation
+        if not (isfinite(x) and isfinite(y) and isfinite(z)):
+            raise ValueError("Rotation values must be finite")
+        head = self._head
+        self._ring[head & (RING_SIZE - 1)] = (x, y, z)
+        self._head = head + 1
+
+    def latest(self):
+        """Return the freshest (x, y, z) sample, or None if nothing arrived since the last call."""
+        head = self._head
+        if head == self._tail:
+            return None
+        self._tail = head
+        return self._ring[(head - 1) & (RING_SIZE - 1)]
 
     def start(self):
         self.thread = threading.Thread(target=self.receive_data)
@@ -21,31 +75,115 @@ class RotationReceiver:
         self.thread.start()
 
     def receive_data(self):
+        if self.cpu is not None and hasattr(os, 'sched_setaffinity'):
+            # pid 0 pins only the calling thread on Linux
+            os.sched_setaffinity(0, {self.cpu})
+
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.reuse_port:
+                # Let the kernel spread incoming connections across every worker's listener
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             s.bind((self.host, self.port))
             s.listen()
-            s.settimeout(1.0)  # seconds
+            s.setblocking(False)
             print(f"Listening for rotation data on port {self.port}")
+            # A single event loop serves the listener and every connection on this thread;
+            # connection tasks still pending on shutdown are cancelled by asyncio.run
+            asyncio.run(self.serve(s))
 
+    async def serve(self, s):
+        loop = asyncio.get_running_loop()
+        connections = set()
+        while self.running:
+            try:
+                conn, addr = await asyncio.wait_for(loop.sock_accept(s), timeout=1.0)  # seconds
+            except asyncio.TimeoutError:
+                continue
+            except Exception as e:
+                self.log_error(f"Error: {e}")
+                await asyncio.sleep(1)
+                continue
+            task = loop.create_task(self.handle_connection(conn, addr))
+            connections.add(task)
+            task.add_done_callback(connections.discard)
+
+    async def handle_connection(self, conn, addr):
+        loop = asyncio.get_running_loop()
+        logger.debug("Connected by %s", addr)
+        conn.setblocking(False)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF_SIZE)
+        # Fixed reassembly buffer, the kernel copies straight into its free tail
+        buf = bytearray(RECV_SIZE)
+        view = memoryview(buf)
+        filled = 0
+        with conn:
             while self.running:
                 try:
-                    conn, addr = s.accept()
-                    with conn:
-                        print(f"Connected by {addr}")
-                        while self.running:
-                            data = conn.recv(1024)
-                            if not data:
-                                break
-                            try:
-                                rotation_data = json.loads(data.decode())
-                                self.latest_rotation = rotation_data
-                            except json.JSONDecodeError:
-                                print("Received invalid JSON data")
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    print(f"Error: {e}")
-                    time.sleep(1)
+                    received = await loop.sock_recv_into(conn, view[filled:])
+                except ConnectionError:
+                    break
+                if not received:
+                    break
+                # Linux drops back to delayed ACKs after a while, so re-arm quick ACKs on every read
+                if hasattr(socket, 'TCP_QUICKACK'):
+                    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+                filled = self.parse_frames(buf, filled + received)
+                if filled < 0:
+                    break
+
+    def log_error(self, message):
+        now = time.monotonic()
+        if now - self._last_error_log < ERROR_LOG_INTERVAL:
+            self._suppressed_errors += 1
+            return
+        if self._suppressed_errors:
+            message = f"{message} ({self._suppressed_errors} more suppressed since the last report)"
+        logger.error(message)
+        self._last_error_log = now
+        self._suppressed_errors = 0
+
+    def parse_frames(self, buf, end):
+        """Consume complete frames from buf[:end] and return how many bytes are left over.
+
+        Returns -1 when a length prefix cannot be trusted and the stream has lost its framing.
+        """
+        start = 0
+        # Each message is prefixed with its length as a 4-byte big-endian integer
+        while end - start >= 4:
+            size, = struct.unpack_from('>I', buf, start)
+            if 4 + size > len(buf):
+                self.log_error("Received oversized frame, closing connection")
+                return -1
+            if end - start < 4 + size:
+                break
+            try:
+                self.push(orjson.loads(buf[start + 4:start + 4 + size]))
+            except orjson.JSONDecodeError:
+                self.log_error("Received invalid JSON data")
+            except (KeyError, TypeError, ValueError, OverflowError):
+                # Valid JSON that is not an object with finite numeric x, y and z
+                self.log_error("Received malformed rotation data")
+            start += 4 + size
+
+        # Move the incomplete tail to the front so the next read appends to it
+        if start:
+            buf[:end - start] = buf[start:end]
+        return end - start
+
+def multiworker_count():
+    """Number of receivers requested through MB_MULTIWORKER, one if unset or invalid."""
+    # MB_MULTIWORKER=N runs N receivers on the same port, each pinned to its own core
+    value = os.environ.get('MB_MULTIWORKER', '1')
+    try:
+        workers = int(value)
+    except ValueError:
+        workers = 0
+    if workers < 1:
+        logger.warning("Ignoring invalid MB_MULTIWORKER=%r, using a single receiver", value)
+        return 1
+    return workers
 
 class CubeRotationOperator(bpy.types.Operator):
     bl_idname = "object.rotate_cube_from_socket"
@@ -55,7 +193,28 @@ class CubeRotationOperator(bpy.types.Operator):
 
     def __init__(self):
         super().__init__()
-        self.receiver = RotationReceiver()
+        workers = multiworker_count()
+        if workers > 1 and hasattr(socket, 'SO_REUSEPORT'):
+            cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else [None]
+            self.receivers = [
+                RotationReceiver(reuse_port=True, cpu=cpus[i % len(cpus)])
+                for i in range(workers)
+            ]
+        else:
+            self.receivers = [RotationReceiver()]
+        self._last = None
+
+    def latest_sample(self):
+        """Drain every worker's ring and return the new sample of the last receiver in list order that has one.
+
+        Samples carry no timestamps, so this is not necessarily the most recent sample across workers.
+        """
+        sample = None
+        for receiver in self.receivers:
+            latest = receiver.latest()
+            if latest is not None:
+                sample = latest
+        return sample
 
     def modal(self, context, event):
         if event.type == 'ESC':
@@ -63,33 +222,47 @@ class CubeRotationOperator(bpy.types.Operator):
             return {'CANCELLED'}
 
         if event.type == 'TIMER':
+            sample = self.latest_sample()
+            if sample is None:
+                return {'PASS_THROUGH'}
+            x, y, z = sample
+            # A stationary board keeps sending the same angles, skip the depsgraph update for those
+            if (self._last is not None
+                    and abs(x - self._last[0]) < ROTATION_EPSILON
+                    and abs(y - self._last[1]) < ROTATION_EPSILON
+                    and abs(z - self._last[2]) < ROTATION_EPSILON):
+                return {'PASS_THROUGH'}
+            self._last = (x, y, z)
+
             try:
-                cube = bpy.data.objects['Cube']
-            except KeyError:
-                self.report({'ERROR'}, "Default cube not found. Please add a cube to the scene.")
+                # Convert Euler angles to quaternion to avoid gimbal lock
+                # this will be useful for the time when magnetometer data is added.
+                self.cube.rotation_quaternion = euler_xyz_to_quaternion(x, y, z)
+            except ReferenceError:
+                self.report({'ERROR'}, "Default cube was removed. Please add a cube to the scene.")
                 self.cancel(context)
                 return {'CANCELLED'}
-            # Convert Euler angles to quaternion to avoid gimbal lock
-            # this will be useful for the time when magnetometer data is added.
-            rotation = mathutils.Euler((
-                radians(self.receiver.latest_rotation['x']),
-                radians(self.receiver.latest_rotation['y']),
-                radians(self.receiver.latest_rotation['z'])
-            ), 'XYZ')
-            cube.rotation_mode = 'QUATERNION'
-            cube.rotation_quaternion = rotation.to_quaternion()
 
         return {'PASS_THROUGH'}
 
     def execute(self, context):
-        self.receiver.start()
+        try:
+            self.cube = bpy.data.objects['Cube']
+        except KeyError:
+            self.report({'ERROR'}, "Default cube not found. Please add a cube to the scene.")
+            return {'CANCELLED'}
+        self.cube.rotation_mode = 'QUATERNION'
+
+        for receiver in self.receivers:
+            receiver.start()
         wm = context.window_manager
         self._timer = wm.event_timer_add(1/OUTPUT_DATA_RATE, window=context.window)
         wm.modal_handler_add(self)
         return {'RUNNING_MODAL'}
 
     def cancel(self, context):
-        self.receiver.running = False
+        for receiver in self.receivers:
+            receiver.running = False
         wm = context.window_manager
         wm.event_timer_remove(self._timer)
 
@@ -28,11 +28,16 @@ impl ConnectionManager {
     }
 
     fn forward_data(&mut self, data: &[u8]) -> io::Result<()> {
+        // Prefix every message with its length so receivers can split the TCP stream
+        let mut frame = Vec::with_capacity(4 + data.len());
+        frame.extend_from_slice(&(data.len() as u32).to_be_bytes());
+        frame.extend_from_slice(data);
+
         if let Some(stream) = &mut self.blender {
-            stream.write_all(data)?;
+            stream.write_all(&frame)?;
         }
         if let Some(stream) = &mut self.visualizer {
-            stream.write_all(data)?;
+            stream.write_all(&frame)?;
         }
         Ok(())
     }
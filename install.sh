@@ -171,7 +171,7 @@ setup_python_env() {
 
     # Create requirements.txt if it doesn't exist
     if [ ! -f "requirements.txt" ]; then
-        echo -e "numpy\nmatplotlib\n" > requirements.txt
+        echo -e "numpy\nmatplotlib\norjson\n" > requirements.txt
     fi
 
     # Activate virtual environment and install dependencies
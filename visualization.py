@@ -1,63 +1,100 @@
+import argparse
+import asyncio
 from errno import EADDRINUSE
 import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+import logging
 import numpy as np
+from math import sin, cos, radians, degrees, isfinite
+import os
 import socket
-import json
+import struct
+try:
+    import orjson
+except ImportError:
+    import json as orjson
 import threading
 import time
 
-matplotlib.use('TkAgg')
+RECV_SIZE = 65536  # bytes
+RING_SIZE = 64  # samples, must be a power of two
+RCVBUF_SIZE = 1 << 20  # bytes
+ERROR_LOG_INTERVAL = 1.0  # seconds
+RECORD_FPS = 20  # matches the 50 ms animation interval
+RECORD_FORMATS = ('.mp4', '.gif')  # ffmpeg and Pillow respectively
+
+logger = logging.getLogger(__name__)
+
+# Fixed isometric view mapping (x, y, z) onto the 2D plot plane
+ISO_PROJECTION = np.array([[1.0, -0.5, 0.0],
+                           [0.0, -0.5, 1.0]])
 
 class AccelerometerVisualizer:
     def __init__(self, port=65433):
         self.fig = plt.figure(figsize=(15, 7))
-        self.ax1 = self.fig.add_subplot(121, projection='3d', elev=20, azim=30)
+        self.ax1 = self.fig.add_subplot(121)
         self.ax2 = self.fig.add_subplot(122)
 
-        self.latest_rotation = {'x': 0.0, 'y': 0.0, 'z': 0.0}
         self.running = True
+        # Single-producer/single-consumer ring of (x, y, z) samples.
+        # Only the receiver thread writes _head and only update_plot writes _tail.
+        self._ring = np.zeros((RING_SIZE, 3), dtype=np.float64)
+        self._head = 0
+        self._tail = 0
+        # Error logging is rate limited so bad input cannot stall the receive loop
+        self._last_error_log = float('-inf')
+        self._suppressed_errors = 0
 
         self.port = port
-        self.thread = threading.Thread(target=self.receive_data)
-        self.thread.daemon = True
-        self.thread.start()
+
+        # Artists must exist before FuncAnimation, which may draw a first blit frame right away
+        self.setup_plots()
 
         self.anim = animation.FuncAnimation(
             self.fig,
             self.update_plot,
             interval=50,
-            blit=False,
+            blit=True,
             cache_frame_data=False
         )
 
-        self.setup_plots()
-
     def setup_plots(self):
-        self.ax1.set_xlim([-10, 10])
-        self.ax1.set_ylim([-10, 10])
-        self.ax1.set_zlim([-10, 5])
-        self.ax1.set_xlabel("X-Axis")
-        self.ax1.set_ylabel("Y-Axis")
-        self.ax1.set_zlabel("Z-Axis")
+        # Vectors are projected with ISO_PROJECTION and drawn as plain 2D lines,
+        # which avoids mplot3d's per-frame projection pass
+        self.ax1.set_xlim([-15, 15])
+        self.ax1.set_ylim([-15, 10])
+        self.ax1.set_aspect('equal')
+        self.ax1.set_axis_off()
         self.ax1.set_title("Accelerometer Vectors")
 
-        origin = np.array([0, 0, 0])
+        for name, tip in (("X-Axis", (10, 0, 0)), ("Y-Axis", (0, 10, 0)), ("Z-Axis", (0, 0, 5))):
+            axis = ISO_PROJECTION @ np.array([[-c for c in tip], tip]).T
+            self.ax1.plot(axis[0], axis[1], color='lightgray', linewidth=1)
+            self.ax1.text(axis[0, 1], axis[1, 1], name, color='gray')
+
+        gravity = ISO_PROJECTION @ np.array([0, 0, -9.8])
         self.vectors = {
-            'gravity': self.ax1.quiver(*origin, 0, 0, -9.8, color='blue',
-                                     label="Gravity Vector"),
-            'x': self.ax1.quiver(*origin, 0, 0, 0, color='red',
-                                label="X-Component"),
-            'y': self.ax1.quiver(*origin, 0, 0, 0, color='green',
-                                label="Y-Component"),
-            'z': self.ax1.quiver(*origin, 0, 0, 0, color='orange',
-                                label="Z-Component"),
-            'resultant': self.ax1.quiver(*origin, 0, 0, 0, color='purple',
-                                       label="Resultant")
+            'gravity': self.ax1.plot([0, gravity[0]], [0, gravity[1]], color='blue',
+                                     label="Gravity Vector")[0],
+            'x': self.ax1.plot([0, 0], [0, 0], color='red',
+                               label="X-Component")[0],
+            'y': self.ax1.plot([0, 0], [0, 0], color='green',
+                               label="Y-Component")[0],
+            'z': self.ax1.plot([0, 0], [0, 0], color='orange',
+                               label="Z-Component")[0],
+            'resultant': self.ax1.plot([0, 0], [0, 0], color='purple',
+                                       label="Resultant")[0]
         }
         self.ax1.legend()
 
+        # Vector tips in 3D and their projections, reused every frame. Rows follow _vec_list.
+        self._vec_list = [self.vectors['x'], self.vectors['y'],
+                          self.vectors['z'], self.vectors['resultant']]
+        self._tips = np.zeros((4, 3))
+        self._tips_2d = np.zeros((4, 2))
+        self._projection_t = ISO_PROJECTION.T.copy()
+
         self.ax2.set_xlim([-1.5, 1.5])
         self.ax2.set_ylim([-1.5, 1.5])
         self.ax2.grid(True)
@@ -66,77 +103,242 @@ class AccelerometerVisualizer:
         self.ax2.add_artist(self.circle)
         self.angle_arrow = self.ax2.arrow(0, 0, 0, 0, head_width=0.05,
                                         head_length=0.1, fc='purple', ec='purple')
+        self.ax2.set_title("Tilt Angles")
+        # Kept inside the axes since blitting only copies the axes bounding box
+        self.angle_text = self.ax2.text(0.02, 0.98, "Pitch: 0.0°, Roll: 0.0°",
+                                        transform=self.ax2.transAxes, va='top')
+        self._text_angles = (0.0, 0.0)
+
+        # Only these artists change between frames, everything else is blitted from the cached background
+        self.animated_artists = (
+            self.vectors['x'],
+            self.vectors['y'],
+            self.vectors['z'],
+            self.vectors['resultant'],
+            self.angle_arrow,
+            self.angle_text,
+        )
+        for artist in self.animated_artists:
+            artist.set_animated(True)
+
+        # Show the board lying flat until the first sample arrives
+        self.draw_tilt(0.0, 0.0)
 
     def receive_data(self):
+        # A single event loop serves the listener and every connection on this thread;
+        # connection tasks still pending on shutdown are cancelled by asyncio.run
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        connections = set()
         while self.running:
             try:
-                conn, _ = self.sock.accept()
-                print(f"Connected to data source")
-                while self.running:
-                    data = conn.recv(1024)
-                    if not data:
-                        break
-                    try:
-                        self.latest_rotation = json.loads(data.decode())
-                    except json.JSONDecodeError:
-                        print("Invalid JSON received")
-            except socket.timeout:
+                conn, _ = await asyncio.wait_for(loop.sock_accept(self.sock), timeout=1.0)
+            except asyncio.TimeoutError:
                 continue
-            except ConnectionResetError:
-                print("Connection was forcibly closed by the remote host")
-            except ConnectionAbortedError:
-                print("Connection was aborted by the software")
-            except OSError as e:
-                if e.errno == EADDRINUSE:
-                    print("Port is already in use. Is another instance running?")
-                    break
             except Exception as e:
-                print(f"Error: {e}")
-                time.sleep(1)
+                self.log_error(f"Error: {e}")
+                await asyncio.sleep(1)
+                continue
+            task = loop.create_task(self.handle_connection(conn))
+            connections.add(task)
+            task.add_done_callback(connections.discard)
+
+    async def handle_connection(self, conn):
+        loop = asyncio.get_running_loop()
+        logger.debug("Connected to data source")
+        conn.setblocking(False)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF_SIZE)
+        # Fixed reassembly buffer, the kernel copies straight into its free tail
+        buf = bytearray(RECV_SIZE)
+        view = memoryview(buf)
+        filled = 0
+        with conn:
+            while self.running:
+                try:
+                    received = await loop.sock_recv_into(conn, view[filled:])
+                except ConnectionResetError:
+                    logger.warning("Connection was forcibly closed by the remote host")
+                    break
+                except ConnectionAbortedError:
+                    logger.warning("Connection was aborted by the software")
+                    break
+                if not received:
+                    break
+                # Linux drops back to delayed ACKs after a while, so re-arm quick ACKs on every read
+                if hasattr(socket, 'TCP_QUICKACK'):
+                    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+                filled = self.parse_frames(buf, filled + received)
+                if filled < 0:
+                    break
+
+    def log_error(self, message):
+        now = time.monotonic()
+        if now - self._last_error_log < ERROR_LOG_INTERVAL:
+            self._suppressed_errors += 1
+            return
+        if self._suppressed_errors:
+            message = f"{message} ({self._suppressed_errors} more suppressed since the last report)"
+        logger.error(message)
+        self._last_error_log = now
+        self._suppressed_errors = 0
+
+    def parse_frames(self, buf, end):
+        """Consume complete frames from buf[:end] and return how many bytes are left over.
+
+        Returns -1 when a length prefix cannot be trusted and the stream has lost its framing.
+        """
+        start = 0
+        # Each message is prefixed with its length as a 4-byte big-endian integer
+        while end - start >= 4:
+            size, = struct.unpack_from('>I', buf, start)
+            if 4 + size > len(buf):
+                self.log_error("Received oversized frame, closing connection")
+                return -1
+            if end - start < 4 + size:
+                break
+            try:
+                self.push(orjson.loads(buf[start + 4:start + 4 + size]))
+            except orjson.JSONDecodeError:
+                self.log_error("Invalid JSON received")
+            except (KeyError, TypeError, ValueError, OverflowError):
+                # Valid JSON that is not an object with finite numeric x, y and z
+                self.log_error("Received malformed rotation data")
+            start += 4 + size
+
+        # Move the incomplete tail to the front so the next read appends to it
+        if start:
+            buf[:end - start] = buf[start:end]
+        return end - start
+
+    def push(self, rotation_data):
+        x, y, z = rotation_data['x'], rotation_data['y'], rotation_data['z']
+        # The stdlib json fallback accepts NaN and Infinity, which would end up in the cube's rotation
+        if not (isfinite(x) and isfinite(y) and isfinite(z)):
+            raise ValueError("Rotation values must be finite")
+        head = self._head
+        self._ring[head & (RING_SIZE - 1)] = (x, y, z)
+        self._head = head + 1
 
     def update_plot(self, _):
-        pitch = np.radians(self.latest_rotation['x'])
-        roll = np.radians(self.latest_rotation['y'])
+        head = self._head
+        if head == self._tail:
+            # Nothing new arrived, the artists already show the latest sample and only need re-blitting.
+            # Returning no artists would make FuncAnimation fall back to a full redraw instead.
+            return self.animated_artists
+        self._tail = head
+        x, y, _z = self._ring[(head - 1) & (RING_SIZE - 1)]
+        self.draw_tilt(radians(x), radians(y))
+        return self.animated_artists
 
-        x_mag = 9.8 * np.sin(roll)
-        y_mag = 9.8 * np.sin(pitch)
-        z_mag = -9.8 * np.cos(pitch) * np.cos(roll)
+    def draw_tilt(self, pitch, roll):
+        sp, cp, sr, cr = sin(pitch), cos(pitch), sin(roll), cos(roll)
 
-        self.vectors['x'].set_segments([np.array([[0, 0, 0], [x_mag, 0, 0]])])
-        self.vectors['y'].set_segments([np.array([[0, 0, 0], [0, y_mag, 0]])])
-        self.vectors['z'].set_segments([np.array([[0, 0, 0], [0, 0, z_mag]])])
+        x_mag = 9.8 * sr
+        y_mag = 9.8 * sp
+        z_mag = -9.8 * cp * cr
 
-        resultant = np.array([x_mag, y_mag, z_mag])
-        self.vectors['resultant'].set_segments([np.array([[0, 0, 0], resultant])])
+        self._tips[0, 0] = x_mag
+        self._tips[1, 1] = y_mag
+        self._tips[2, 2] = z_mag
+        self._tips[3] = (x_mag, y_mag, z_mag)
+        np.dot(self._tips, self._projection_t, out=self._tips_2d)
+        for vector, (tip_x, tip_y) in zip(self._vec_list, self._tips_2d):
+            vector.set_data((0.0, tip_x), (0.0, tip_y))
 
-        self.ax2.clear()
-        self.ax2.set_xlim([-1.5, 1.5])
-        self.ax2.set_ylim([-1.5, 1.5])
-        self.ax2.grid(True)
-        self.ax2.set_aspect('equal')
-        self.ax2.add_artist(plt.Circle((0, 0), 1, fill=False, color='gray'))
-        self.ax2.arrow(0, 0, np.sin(roll), np.sin(pitch),
-                      head_width=0.05, head_length=0.1, fc='purple', ec='purple')
-        self.ax2.set_title(f"Tilt Angles\nPitch: {np.degrees(pitch):.1f}°, "
-                          f"Roll: {np.degrees(roll):.1f}°")
+        self.angle_arrow.set_data(dx=sr, dy=sp)
 
-        return self.vectors.values()
+        pitch_deg, roll_deg = degrees(pitch), degrees(roll)
+        if (abs(pitch_deg - self._text_angles[0]) > 0.5
+                or abs(roll_deg - self._text_angles[1]) > 0.5):
+            self.angle_text.set_text(f"Pitch: {pitch_deg:.1f}°, Roll: {roll_deg:.1f}°")
+            self._text_angles = (pitch_deg, roll_deg)
 
     def setup_network(self):
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sock.bind(('127.0.0.1', self.port))
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            self.sock.bind(('127.0.0.1', self.port))
+        except OSError as e:
+            if e.errno == EADDRINUSE:
+                print("Port is already in use. Is another instance running?")
+            raise
         self.sock.listen(1)
-        self.sock.settimeout(1.0)
+        self.sock.setblocking(False)
         print(f"Listening on port {self.port}")
 
         self.thread = threading.Thread(target=self.receive_data)
         self.thread.daemon = True
         self.thread.start()
 
-    def run(self):
+    def record(self, path, duration=10):
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.mp4':
+            writer = animation.FFMpegWriter(
+                fps=RECORD_FPS,
+                codec='h264',
+                extra_args=['-preset', 'ultrafast', '-pix_fmt', 'yuv420p']
+            )
+        elif extension == '.gif':
+            writer = animation.PillowWriter(fps=RECORD_FPS)
+        else:
+            raise ValueError(f"Unsupported recording format {path!r}, use one of: {', '.join(RECORD_FORMATS)}")
+
+        print(f"Recording {duration}s to {path}")
+        interval = 1 / RECORD_FPS
+        frames = int(duration * RECORD_FPS)
+        repeated = 0
+        slot = 0
+        start = time.monotonic()
+        with writer.saving(self.fig, path, dpi=self.fig.dpi):
+            while slot < frames:
+                self.update_plot(None)
+                writer.grab_frame()
+                slot += 1
+                # Frame slots are fixed against the start time. Slots that passed while rendering
+                # repeat the last frame, so the file always holds exactly `frames` frames.
+                current = min(int((time.monotonic() - start) / interval), frames)
+                while slot < current:
+                    writer.grab_frame()
+                    repeated += 1
+                    slot += 1
+                if slot < frames:
+                    time.sleep(max(0.0, start + slot * interval - time.monotonic()))
+
+        if repeated:
+            logger.warning("Rendering could not keep up, repeated %d of %d frames", repeated, frames)
+
+    def run(self, record=None, duration=10, headless=False):
         self.setup_network()
-        plt.show()
+        if record:
+            self.record(record, duration)
+        elif not headless:
+            plt.show()
+
+def recording_path(path):
+    if os.path.splitext(path)[1].lower() not in RECORD_FORMATS:
+        raise argparse.ArgumentTypeError(
+            f"unsupported format {path!r}, use one of: {', '.join(RECORD_FORMATS)}")
+    return path
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Visualize Microbit accelerometer data")
+    parser.add_argument('--headless', action='store_true',
+                        help="Render offscreen with the Agg backend instead of opening a window")
+    parser.add_argument('--record', metavar='PATH', type=recording_path,
+                        help="Save the visualization to a video file (.mp4 via ffmpeg or .gif via Pillow)")
+    parser.add_argument('--duration', type=float, default=10,
+                        help="Length of the recording in seconds (default: 10)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    if args.headless and not args.record:
+        parser.error("--headless requires --record")
+    # Must happen before the figure is created, and TkAgg cannot even be selected without a display
+    matplotlib.use('Agg' if args.headless else 'TkAgg')
+
     visualizer = AccelerometerVisualizer()
-    visualizer.run()
\ No newline at end of file
+    visualizer.run(args.record, args.duration, args.headless)
\ No newline at end of file